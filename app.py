@@ -1,23 +1,44 @@
 import os
 import errno
-import locale
+import hashlib
 import json
+import queue
 import random
+import shutil
 import subprocess
+import tempfile
+import threading
+import time
 import uuid
 import requests
 import logging
-from datetime import datetime, timedelta
-from flask import Flask, render_template, request, redirect, url_for, jsonify, abort
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from flask import Flask, render_template, stream_template, request, redirect, url_for, jsonify, abort
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.middleware.proxy_fix import ProxyFix
 from pdf2image import convert_from_path
 from urllib.parse import urlparse
 from typing import Optional, Dict, List
 from werkzeug.utils import secure_filename
 from icalendar import Calendar
-import pytz
 import recurring_ical_events
 
+try:
+    import orjson  # Faster JSON for config/state files and API responses
+except ImportError:
+    orjson = None
+
+try:
+    import pymupdf  # In-process PDF rendering; pdf2image/poppler is the fallback
+except ImportError:
+    pymupdf = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -48,7 +69,11 @@ os.makedirs(os.path.join(STATIC_FOLDER, 'js'), exist_ok=True)
 # Files for persistent settings and dynamic state
 CONFIG_FILE = os.path.join(DATA_DIR, 'config.json')
 UPDATE_FILE = os.path.join(DATA_DIR, 'last_updates.json')
+# Content hash of each plan's rendered pages, used to skip no-op re-uploads
+PAGE_HASHES_FILE = os.path.join(DATA_DIR, 'page_hashes.json')
 DASHBOARD_MODE_FILE = os.path.join(DATA_DIR, 'dashboard_mode.json')
+# Home Assistant add-on options (MQTT overrides), when running under Supervisor
+OPTIONS_FILE = os.path.join(DATA_DIR, 'options.json')
 VERSION_FILE = os.path.join(BASE_DIR, 'VERSION')
 
 # App version and release URL (for admin footer)
@@ -99,44 +124,268 @@ def redact_url_for_log(raw_url: str) -> str:
         host = f"{host}:{parsed.port}"
     return f"{parsed.scheme}://{host}{parsed.path}"
 
+# Calendars are fetched concurrently; the HTTP pool is sized to match so
+# parallel fetches against the same host don't discard connections.
+CALENDAR_FETCH_WORKERS = 8
+CAL_POOL = ThreadPoolExecutor(max_workers=CALENDAR_FETCH_WORKERS, thread_name_prefix='calendar-fetch')
+
+def json_loads(text):
+    """Parse JSON text or UTF-8 bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+# Non-str dict keys are stringified, as the stdlib encoder does, instead of raising
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+def _json_default(obj):
+    """Encode the extra types orjson handles natively, so the stdlib fallback produces the same JSON."""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def json_dumps_bytes(obj, indent: bool = False, sort_keys: bool = False) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes, using orjson when it is installed.
+
+    Used for state files and API responses alike, so both follow the same encoding rules.
+    """
+    if orjson is not None:
+        option = _ORJSON_OPTIONS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_json_default, option=option)
+    return json.dumps(obj, indent=2 if indent else None, separators=None if indent else (',', ':'),
+                      sort_keys=sort_keys, default=_json_default).encode('utf-8')
+
+
+def atomic_write_bytes(path: str, data: bytes, durable: bool = False):
+    """Replace path with data via a temp file + os.replace, so readers never see a partial file.
+
+    Falls back to writing in place when the file is a bind mount that cannot be
+    replaced (EBUSY/EXDEV). Pass durable=True to fsync before the replace.
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb', buffering=65536) as f:
+            f.write(data)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except OSError as e:
+        if e.errno not in (errno.EBUSY, errno.EXDEV):
+            raise
+        with open(path, 'wb') as f:
+            f.write(data)
+        logger.warning(f"Atomic replace failed; wrote directly to {os.path.basename(path)}.")
+    finally:
+        # Normally already moved into place by os.replace
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+# Shared HTTP session so calendar polls and screensaver downloads reuse
+# keep-alive connections instead of paying a TCP/TLS handshake per request.
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+_http_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=CALENDAR_FETCH_WORKERS, max_retries=Retry(total=2, backoff_factor=0.3))
+HTTP_SESSION.mount('http://', _http_adapter)
+HTTP_SESSION.mount('https://', _http_adapter)
+
 # Allowed file extensions for security
-ALLOWED_PDF_EXTENSIONS = {'pdf'}
-ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'avif'}
+ALLOWED_PDF_EXTENSIONS = frozenset({'pdf'})
+ALLOWED_IMAGE_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'webp', 'avif'})
 
 # --- Helper Functions ---
 def allowed_file(filename, allowed_extensions):
     """Check if the file extension is allowed."""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in allowed_extensions
+    dot = filename.rfind('.')
+    return dot != -1 and filename[dot + 1:].lower() in allowed_extensions
+
+# Uploads are copied to disk in 1 MiB chunks (FileStorage.save uses 16 KiB)
+UPLOAD_COPY_BUFFER = 1024 * 1024
+
+
+def save_upload(file, filepath: str):
+    """Write an uploaded file to filepath using a large copy buffer."""
+    with open(filepath, 'wb') as out:
+        shutil.copyfileobj(file.stream, out, length=UPLOAD_COPY_BUFFER)
+
+# Screensaver images downloaded from a URL are capped to protect disk space
+MAX_SCREENSAVER_DOWNLOAD_BYTES = 20 * 1024 * 1024
+# Only plain web URLs may be downloaded (no file://, data:, ftp:// and so on)
+_ALLOWED_SCHEMES = frozenset(("http", "https"))
+# Bodies are read straight off the raw urllib3 stream in large blocks, which
+# skips the iter_content generator and keeps the per-block Python work small
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def download_to_file(response, filepath: str, max_bytes: int):
+    """Stream a response body to filepath; raises ValueError and removes the partial file past max_bytes."""
+    raw = response.raw
+    total = 0
+    try:
+        with open(filepath, 'wb') as f:
+            while True:
+                chunk = raw.read(DOWNLOAD_CHUNK_SIZE, decode_content=True)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > max_bytes:
+                    raise ValueError(f"Download exceeds {max_bytes} bytes")
+                f.write(chunk)
+    except BaseException:
+        try:
+            os.remove(filepath)
+        except OSError:
+            pass
+        raise
+
+# The dashboard scales plan images to fit (object-fit: contain); 150 DPI gives an
+# A4 page of ~1240x1754 px, ample for the display and much cheaper than 200.
+PDF_RENDER_DPI = 150
+
+
+def _load_page_hashes() -> Dict[str, str]:
+    try:
+        with open(PAGE_HASHES_FILE, 'rb') as f:
+            return json_loads(f.read())
+    except (json.JSONDecodeError, IOError):
+        return {}
+
+
+def _pages_unchanged(target: str, digest: str) -> bool:
+    """Return True when the rendered pages hash the same as the plan's current images."""
+    if _load_page_hashes().get(target) != digest:
+        return False
+    return os.path.exists(os.path.join(STATIC_IMAGE_FOLDER, f"{target}-ukeplan.png"))
+
+
+def _store_page_hash(target: str, digest: str):
+    hashes = _load_page_hashes()
+    hashes[target] = digest
+    try:
+        atomic_write_bytes(PAGE_HASHES_FILE, json_dumps_bytes(hashes, indent=True))
+    except IOError as e:
+        logger.warning(f"Could not save page hashes: {e}")
+
+
+def render_pdf_pages(pdf_path: str, target: str) -> int:
+    """Render the first two PDF pages to the plan's weekplan PNGs.
+
+    Returns the number of pages written, or 0 when the rendered pages are identical
+    to the current images (the files are then left alone so clients keep their cache).
+    """
+    image_paths = [
+        os.path.join(STATIC_IMAGE_FOLDER, f"{target}-ukeplan.png"),
+        os.path.join(STATIC_IMAGE_FOLDER, f"{target}-ukeplan-2.png"),
+    ]
+    if pymupdf is not None:
+        try:
+            with pymupdf.open(pdf_path) as doc:
+                pixmaps = [doc.load_page(i).get_pixmap(dpi=PDF_RENDER_DPI) for i in range(min(2, doc.page_count))]
+            digest = hashlib.blake2b(digest_size=16)
+            for pix in pixmaps:
+                digest.update(f"{pix.width}x{pix.height}x{pix.n}:".encode())
+                digest.update(pix.samples)
+            digest = digest.hexdigest()
+            if _pages_unchanged(target, digest):
+                logger.info(f"Rendered pages for {target} are unchanged; keeping existing images")
+                return 0
+            for pix, image_path in zip(pixmaps, image_paths):
+                pix.save(image_path)
+            _store_page_hash(target, digest)
+            return len(pixmaps)
+        except Exception as e:
+            logger.warning(f"PyMuPDF conversion failed, falling back to pdf2image: {e}")
+    # Let pdftoppm write the PNGs itself (one thread per page) instead of
+    # decoding every page into a PIL image and re-encoding it here.
+    thread_count = max(1, (os.cpu_count() or 2) - 1)
+    with tempfile.TemporaryDirectory(dir=UPLOAD_FOLDER) as tmpdir:
+        rendered = convert_from_path(pdf_path, dpi=PDF_RENDER_DPI, first_page=1, last_page=2, fmt='png',
+                                     thread_count=thread_count, output_folder=tmpdir, paths_only=True,
+                                     use_pdftocairo=True)
+        digest = hashlib.blake2b(digest_size=16)
+        for rendered_path in rendered:
+            with open(rendered_path, 'rb') as f:
+                digest.update(f.read())
+        digest = digest.hexdigest()
+        if _pages_unchanged(target, digest):
+            logger.info(f"Rendered pages for {target} are unchanged; keeping existing images")
+            return 0
+        for rendered_path, image_path in zip(rendered, image_paths):
+            shutil.move(rendered_path, image_path)
+    _store_page_hash(target, digest)
+    return len(rendered)
+
+SYSTEM_STATS_TTL = 3  # seconds; admin page and status refreshes reuse one reading
+_system_stats_cache = {"expires": 0.0, "stats": None}
+_system_stats_lock = threading.Lock()
 
 def get_system_stats():
-    """Get container-friendly system statistics for the Controls tab."""
+    """Get container-friendly system statistics, cached for SYSTEM_STATS_TTL seconds."""
+    with _system_stats_lock:
+        now = time.monotonic()
+        if _system_stats_cache["stats"] is None or now >= _system_stats_cache["expires"]:
+            _system_stats_cache["stats"] = _collect_system_stats()
+            _system_stats_cache["expires"] = now + SYSTEM_STATS_TTL
+        return dict(_system_stats_cache["stats"])
+
+def _read_first_line(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            return handle.readline().strip()
+    except Exception:
+        return None
+
+
+def _format_bytes(value_bytes: int) -> str:
+    if value_bytes < 1024:
+        return f"{value_bytes} B"
+    if value_bytes < 1024 ** 2:
+        return f"{value_bytes / 1024:.1f} KB"
+    if value_bytes < 1024 ** 3:
+        return f"{value_bytes / (1024 ** 2):.1f} MB"
+    return f"{value_bytes / (1024 ** 3):.1f} GB"
+
+
+@lru_cache(maxsize=1)
+def _get_memory_limit() -> str:
+    """cgroup v2 memory limit; it cannot change without a container restart."""
+    memory_max = _read_first_line("/sys/fs/cgroup/memory.max")
+    if memory_max == "max":
+        return "Unlimited"
+    if memory_max and memory_max.isdigit():
+        return _format_bytes(int(memory_max))
+    return "Unknown"
+
+
+@lru_cache(maxsize=1)
+def _get_container_id() -> str:
+    return _read_first_line("/etc/hostname") or "Unknown"
+
+
+def _collect_system_stats():
+    """Read container-friendly system statistics for the Controls tab."""
     stats = {
         "uptime": "Unknown",
         "start_time": "Unknown",
         "memory_usage": "Unknown",
-        "memory_limit": "Unknown",
-        "container_id": "Unknown"
+        "memory_limit": _get_memory_limit(),
+        "container_id": _get_container_id()
     }
 
-    def read_first_line(path: str) -> Optional[str]:
-        try:
-            with open(path, "r", encoding="utf-8") as handle:
-                return handle.readline().strip()
-        except Exception:
-            return None
-
-    def format_bytes(value_bytes: int) -> str:
-        if value_bytes < 1024:
-            return f"{value_bytes} B"
-        if value_bytes < 1024 ** 2:
-            return f"{value_bytes / 1024:.1f} KB"
-        if value_bytes < 1024 ** 3:
-            return f"{value_bytes / (1024 ** 2):.1f} MB"
-        return f"{value_bytes / (1024 ** 3):.1f} GB"
-
     try:
-        uptime_line = read_first_line("/proc/uptime")
+        uptime_line = _read_first_line("/proc/uptime")
         if uptime_line:
             uptime_seconds = int(float(uptime_line.split()[0]))
             delta = timedelta(seconds=uptime_seconds)
@@ -144,70 +393,180 @@ def get_system_stats():
             stats["start_time"] = (datetime.now() - delta).strftime("%Y-%m-%d %H:%M:%S")
 
         try:
-            with open("/proc/self/status", "r", encoding="utf-8") as handle:
+            with open("/proc/self/status", "rb") as handle:
                 status_content = handle.read()
         except Exception:
-            status_content = ""
-        for line in status_content.splitlines():
-            if line.startswith("VmRSS:"):
-                parts = line.split()
-                if len(parts) >= 2 and parts[1].isdigit():
-                    stats["memory_usage"] = format_bytes(int(parts[1]) * 1024)
-                break
-
-        memory_max = read_first_line("/sys/fs/cgroup/memory.max")
-        if memory_max:
-            if memory_max == "max":
-                stats["memory_limit"] = "Unlimited"
-            elif memory_max.isdigit():
-                stats["memory_limit"] = format_bytes(int(memory_max))
-
-        container_id = read_first_line("/etc/hostname")
-        if container_id:
-            stats["container_id"] = container_id
+            status_content = b""
+        i = status_content.find(b"VmRSS:")
+        if i != -1:
+            rss = status_content[i + 6:status_content.find(b"\n", i)].split()
+            if rss and rss[0].isdigit():
+                stats["memory_usage"] = _format_bytes(int(rss[0]) * 1024)
     except Exception as e:
         logger.error(f"Could not retrieve all system stats: {e}")
 
     return stats
 
-def fetch_calendar_events(ical_url: str, days_ahead: int = 14) -> List[Dict]:
+# Timezone calendar events are presented in, and fixed English weekday names
+# (avoids locale-dependent strftime in the per-event loop).
+LOCAL_TZ = ZoneInfo('Europe/Oslo')  # Adjust timezone as needed
+_UTC = timezone.utc
+WEEKDAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# --- Calendar Cache ---
+# Parsed calendars are kept per feed URL and revalidated with a conditional GET
+# (ETag / Last-Modified) once the soft TTL expires, so dashboard polls within the
+# TTL skip the network entirely and unchanged feeds are never re-parsed.
+CALENDAR_CACHE_TTL = 60  # seconds
+# Recurrences are expanded once over this horizon; shorter windows (the 3-day
+# per-plan view, the 14-day admin view) are sliced from the expanded list.
+CALENDAR_EXPANSION_DAYS = 30
+# Feeds are streamed into memory up to this size; larger ones are rejected
+MAX_CALENDAR_BYTES = 10 * 1024 * 1024
+# Set DEBUG_CAL=1 to log a summary of the processed events on every fetch
+DEBUG_CAL = os.environ.get('DEBUG_CAL', '').lower() in ('1', 'true', 'yes')
+_CAL_CACHE: Dict[str, dict] = {}
+_CAL_CACHE_LOCK = threading.Lock()
+
+
+def _read_capped(response, max_bytes: int) -> bytes:
+    """Read a streamed response body into memory; raises RequestException past max_bytes."""
+    content_length = response.headers.get('content-length', '')
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise requests.RequestException(f"Response too large: {content_length} bytes")
+    raw = response.raw
+    buf = bytearray()
+    while True:
+        chunk = raw.read(DOWNLOAD_CHUNK_SIZE, decode_content=True)
+        if not chunk:
+            break
+        buf += chunk
+        if len(buf) > max_bytes:
+            raise requests.RequestException(f"Response exceeds {max_bytes} bytes")
+    return bytes(buf)
+
+
+def _get_calendar(normalized_url: str, safe_url: str) -> dict:
+    """Return the cache entry for a feed, downloading or revalidating it when the TTL has expired."""
+    with _CAL_CACHE_LOCK:
+        entry = _CAL_CACHE.get(normalized_url)
+    if entry is not None and time.monotonic() < entry['expires']:
+        return entry
+
+    headers = {}
+    if entry is not None:
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_mod']:
+            headers['If-Modified-Since'] = entry['last_mod']
+
+    logger.info("Fetching calendar from: %s", safe_url)
+    try:
+        with HTTP_SESSION.get(normalized_url, headers=headers, timeout=10, stream=True) as response:
+            if response.status_code == 304 and entry is not None:
+                logger.info("Calendar not modified, reusing parsed calendar")
+                entry['expires'] = time.monotonic() + CALENDAR_CACHE_TTL
+                return entry
+            response.raise_for_status()
+            content = _read_capped(response, MAX_CALENDAR_BYTES)
+    except requests.RequestException as e:
+        if entry is None:
+            raise
+        # Serve the last good copy rather than dropping all events on a transient error
+        logger.warning("Error refreshing calendar from %s, serving cached copy: %s", safe_url, e)
+        entry['expires'] = time.monotonic() + CALENDAR_CACHE_TTL
+        return entry
+
+    logger.info("Calendar data fetched, size: %d bytes", len(content))
+    cal = Calendar.from_ical(content)
+    entry = {
+        'etag': response.headers.get('ETag'),
+        'last_mod': response.headers.get('Last-Modified'),
+        'cal': cal,
+        'expires': time.monotonic() + CALENDAR_CACHE_TTL,
+        'expanded': None,
+        # Sliced event lists per (start date ordinal, days_ahead) request window
+        'windows': {},
+        # recurring_ical_events query, built on first use and kept with the calendar
+        'query': None,
+    }
+    with _CAL_CACHE_LOCK:
+        _CAL_CACHE[normalized_url] = entry
+    return entry
+
+
+def _store_window(entry: dict, window_key: tuple, expanded: List[tuple], end_date, tags: dict) -> List[Dict]:
+    """Slice the expanded (start_datetime, window_date, event) triples starting before end_date,
+    remember the slice under window_key and return copies of the events merged with tags."""
+    window = [event for _, window_date, event in expanded if window_date < end_date]
+    entry['windows'][window_key] = window
+    return [dict(event, **tags) for event in window]
+
+
+def normalize_calendar_url(ical_url: str) -> str:
+    """Normalize webcal:// URLs to https:// (webcal is just a protocol hint, not a real protocol)."""
+    return ical_url.replace('webcal://', 'https://', 1) if ical_url.startswith('webcal://') else ical_url
+
+
+def invalidate_calendar_cache(ical_url: Optional[str] = None):
+    """Drop the cached calendar for one feed URL, or all feeds, so the next request refetches it."""
+    with _CAL_CACHE_LOCK:
+        if ical_url is None:
+            _CAL_CACHE.clear()
+        else:
+            _CAL_CACHE.pop(normalize_calendar_url(ical_url), None)
+
+
+def fetch_calendar_events(ical_url: str, days_ahead: int = 14, calendar_name: Optional[str] = None,
+                          calendar_color: Optional[str] = None) -> List[Dict]:
     """Fetch and parse iCal events from a URL, returning events for the next N days including recurring events.
-    Default N is 14 (2 weeks)."""
-    # Normalize webcal:// URLs to https:// (webcal is just a protocol hint, not a real protocol)
-    normalized_url = ical_url.replace('webcal://', 'https://', 1) if ical_url.startswith('webcal://') else ical_url
+    Default N is 14 (2 weeks). When given, calendar_name/calendar_color are set on every returned event."""
+    normalized_url = normalize_calendar_url(ical_url)
+    tags = {}
+    if calendar_name is not None:
+        tags['calendar_name'] = calendar_name
+    if calendar_color is not None:
+        tags['calendar_color'] = calendar_color
     
     safe_url = redact_url_for_log(normalized_url)
     try:
-        logger.info(f"Fetching calendar from: {safe_url}")
-        
-        # Fetch the iCal data
-        response = requests.get(normalized_url, timeout=10)
-        response.raise_for_status()
-        
-        logger.info(f"Calendar data fetched, size: {len(response.content)} bytes")
+        entry = _get_calendar(normalized_url, safe_url)
         
         # Get current date and window end
         now = datetime.now()
         window_end = now + timedelta(days=days_ahead)
         
-        logger.info(f"Date range: {now.strftime('%Y-%m-%d %H:%M')} to {window_end.strftime('%Y-%m-%d %H:%M')}")
-        
-        # Parse the calendar first
-        cal = Calendar.from_ical(response.content)
-        
         # Use recurring_ical_events to get all events (including recurring) within the date range
         # The library expects dates, not datetimes for the between() method
         start_date = now.date()
         end_date = window_end.date()
         
-        logger.info(f"Using date range for recurring events: {start_date} to {end_date}")
+        window_key = (start_date.toordinal(), days_ahead)
+        window = entry['windows'].get(window_key)
+        if window is not None:
+            return [dict(event, **tags) for event in window]
+        
+        expanded = entry['expanded']
+        if expanded is not None and expanded[0] == start_date and expanded[1] >= end_date:
+            return _store_window(entry, window_key, expanded[2], end_date, tags)
         
-        events_in_range = recurring_ical_events.of(cal).between(start_date, end_date)
+        horizon_end = start_date + timedelta(days=max(CALENDAR_EXPANSION_DAYS, days_ahead))
+        logger.info("Using date range for recurring events: %s to %s", start_date, horizon_end)
         
-        logger.info(f"Found {len(events_in_range)} events in range")
+        query = entry['query']
+        if query is None:
+            query = entry['query'] = recurring_ical_events.of(entry['cal'])
+        events_in_range = query.between(start_date, horizon_end)
+        
+        logger.info("Found %d events in range", len(events_in_range))
         
         events = []
-        local_tz = pytz.timezone('Europe/Oslo')  # Adjust timezone as needed
+        append = events.append
+        local_tz = LOCAL_TZ
+        utc = _UTC
+        weekday_names = WEEKDAY_NAMES
+        midnight = datetime.min.time()
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
         
         for i, event in enumerate(events_in_range):
             try:
@@ -216,58 +575,69 @@ def fetch_calendar_events(ical_url: str, days_ahead: int = 14) -> List[Dict]:
                 location = str(event.get('location', ''))
                 dtstart = event.get('dtstart')
                 
-                logger.debug(f"Processing event {i+1}: {summary}")
+                if debug_enabled:
+                    logger.debug("Processing event %d: %s", i + 1, summary)
                 
-                if dtstart:
-                    # Handle different datetime formats
-                    if hasattr(dtstart.dt, 'astimezone'):
-                        # It's a datetime object with timezone
-                        event_start = dtstart.dt
-                        if event_start.tzinfo is None:
-                            event_start = event_start.replace(tzinfo=pytz.UTC)
-                        local_start = event_start.astimezone(local_tz)
-                    elif hasattr(dtstart.dt, 'year'):
-                        # It's a date object (all-day event), convert to datetime
-                        event_start = datetime.combine(dtstart.dt, datetime.min.time())
-                        event_start = event_start.replace(tzinfo=local_tz)
-                        local_start = event_start
-                    else:
-                        continue
-                    
-                    # Check if it's an all-day event
-                    is_all_day = not hasattr(dtstart.dt, 'hour') or (
-                        hasattr(dtstart.dt, 'hour') and dtstart.dt.hour == 0 and dtstart.dt.minute == 0
-                    )
-                    
-                    event_data = {
-                        'summary': summary,
-                        'location': location,
-                        'start_datetime': local_start.isoformat(),
-                        'start_date': local_start.strftime('%Y-%m-%d'),
-                        'start_time': 'All day' if is_all_day else local_start.strftime('%H:%M'),
-                        'weekday': local_start.strftime('%A'),
-                        'is_all_day': is_all_day
-                    }
-                    events.append(event_data)
+                if not dtstart:
+                    continue
+                start = dtstart.dt
+                # datetime is a date subclass, so it has to be checked first
+                if isinstance(start, datetime):
+                    local_start = (start if start.tzinfo is not None else start.replace(tzinfo=utc)).astimezone(local_tz)
+                    # Midnight starts are shown as all-day events
+                    is_all_day = start.hour == 0 and start.minute == 0
+                    # Windows are sliced on the start date in the event's own timezone,
+                    # which is what recurring_ical_events compares date bounds against.
+                    window_date = start.date()
+                elif isinstance(start, date):
+                    # All-day event, shown from local midnight
+                    local_start = datetime.combine(start, midnight, tzinfo=local_tz)
+                    is_all_day = True
+                    window_date = start
+                else:
+                    continue
+                
+                start_iso = local_start.isoformat()
+                append((start_iso, window_date, {
+                    'summary': summary,
+                    'location': location,
+                    'start_datetime': start_iso,
+                    'start_date': f"{local_start.year:04d}-{local_start.month:02d}-{local_start.day:02d}",
+                    'start_time': 'All day' if is_all_day else f"{local_start.hour:02d}:{local_start.minute:02d}",
+                    'weekday': weekday_names[local_start.weekday()],
+                    'is_all_day': is_all_day
+                }))
                     
             except Exception as e:
-                logger.warning(f"Error parsing event: {e}")
+                logger.warning("Error parsing event: %s", e)
                 continue
         
         # Sort events by start time
-        events.sort(key=lambda x: x['start_datetime'])
+        events.sort(key=itemgetter(0))
         
-        logger.info(f"Returning {len(events)} processed events")
-        for event in events[:3]:  # Log first 3 events for debugging
-            logger.info(f"Event: {event['summary']} at {event['start_date']} {event['start_time']}")
+        if DEBUG_CAL:
+            logger.info("Returning %d processed events", len(events))
+            for _, _, event in events[:3]:  # Log first 3 events for debugging
+                logger.info("Event: %s at %s %s", event['summary'], event['start_date'], event['start_time'])
         
-        return events
+        entry['expanded'] = (start_date, horizon_end, events)
+        entry['windows'] = {}
+        return _store_window(entry, window_key, events, end_date, tags)
         
     except Exception as e:
-        logger.error(f"Error fetching calendar from {safe_url}: {e}")
+        logger.error("Error fetching calendar from %s: %s", safe_url, e)
         return []
 
 # --- Configuration Management ---
+def file_signature(path: str) -> Optional[tuple]:
+    """Return a cheap change token for a file (mtime, size, inode), or None if it is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
 # Env var names for MQTT overrides (Docker/HA). HA Supervisor may pass MQTT_* from options.
 # Per config_key: list of (env_var_name, parser); first set env var wins.
 _ENV_MQTT_MAP = {
@@ -282,79 +652,85 @@ _ENV_MQTT_MAP = {
 }
 
 
-def _apply_env_overrides(config: dict) -> dict:
-    """Override config with env vars when set. WEEKPLANS_* takes precedence over MQTT_*."""
+def _resolve_env_overrides() -> Dict[str, tuple]:
+    """Map each overridable config key to (raw env value, parser) for the first env var that is set."""
+    resolved = {}
     for config_key, env_parsers in _ENV_MQTT_MAP.items():
         for env_key, parser in env_parsers:
             val = os.environ.get(env_key)
             if val is not None and val != "":
-                try:
-                    config[config_key] = parser(val)
-                except (ValueError, TypeError):
-                    pass
+                resolved[config_key] = (val, parser)
                 break
+    return resolved
+
+
+# The process environment does not change after start (containers pass it once),
+# so overrides are resolved a single time instead of on every config reload.
+_ENV_RESOLVED = _resolve_env_overrides()
+
+
+def _apply_env_overrides(config: dict) -> dict:
+    """Override config with env vars when set. WEEKPLANS_* takes precedence over MQTT_*."""
+    for config_key, (val, parser) in _ENV_RESOLVED.items():
+        try:
+            config[config_key] = parser(val)
+        except (ValueError, TypeError):
+            pass
     return config
 
 
 def get_mqtt_env_controlled() -> set:
     """Return the set of MQTT config keys that are currently overridden by environment variables."""
-    controlled = set()
-    for config_key, env_parsers in _ENV_MQTT_MAP.items():
-        for env_key, _ in env_parsers:
-            val = os.environ.get(env_key)
-            if val is not None and val != "":
-                controlled.add(config_key)
-                break
-    return controlled
+    return set(_ENV_RESOLVED)
+
+
+# options.json keys (Home Assistant add-on) that override MQTT config.
+# Each row: (options key, config key, "is set" test, parser).
+_OPTIONS_MQTT_MAP = [
+    ("mqtt_enabled", "enable_mqtt", lambda opts, k: opts.get(k) is not None, bool),
+    ("mqtt_broker", "mqtt_broker", lambda opts, k: bool(opts.get(k)), str),
+    ("mqtt_port", "mqtt_port", lambda opts, k: opts.get(k) is not None, int),
+    ("mqtt_user", "mqtt_user", lambda opts, k: k in opts, str),
+    ("mqtt_pass", "mqtt_pass", lambda opts, k: k in opts, str),
+]
+
+_options_cache = None  # (file signature, overrides, controlled)
+
+
+def _load_options_json():
+    """Return (overrides, controlled keys) from options.json, re-parsed only when the file changes."""
+    global _options_cache
+    signature = file_signature(OPTIONS_FILE)
+    cached = _options_cache
+    if cached is not None and cached[0] == signature:
+        return cached[1], cached[2]
+    overrides, controlled = {}, set()
+    if signature is not None:
+        try:
+            with open(OPTIONS_FILE, "rb") as f:
+                opts = json_loads(f.read())
+        except (json.JSONDecodeError, IOError):
+            opts = {}
+        for opt_key, config_key, is_set, parser in _OPTIONS_MQTT_MAP:
+            if not is_set(opts, opt_key):
+                continue
+            controlled.add(config_key)
+            try:
+                overrides[config_key] = parser(opts[opt_key])
+            except (ValueError, TypeError):
+                pass
+    _options_cache = (signature, overrides, frozenset(controlled))
+    return overrides, _options_cache[2]
 
 
 def get_mqtt_options_controlled() -> set:
     """Return the set of MQTT config keys overridden by Home Assistant options.json."""
-    options_file = os.path.join(DATA_DIR, "options.json")
-    if not os.path.exists(options_file):
-        return set()
-    controlled = set()
-    try:
-        with open(options_file, "r", encoding="utf-8") as f:
-            opts = json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return set()
-    if opts.get("mqtt_enabled") is not None:
-        controlled.add("enable_mqtt")
-    if opts.get("mqtt_broker"):
-        controlled.add("mqtt_broker")
-    if opts.get("mqtt_port") is not None:
-        controlled.add("mqtt_port")
-    if "mqtt_user" in opts:
-        controlled.add("mqtt_user")
-    if "mqtt_pass" in opts:
-        controlled.add("mqtt_pass")
-    return controlled
+    return set(_load_options_json()[1])
 
 
 def _apply_options_json_overrides(config: dict) -> dict:
     """Override MQTT config from Home Assistant options.json when present."""
-    options_file = os.path.join(DATA_DIR, "options.json")
-    if not os.path.exists(options_file):
-        return config
-    try:
-        with open(options_file, "r", encoding="utf-8") as f:
-            opts = json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return config
-    if opts.get("mqtt_enabled") is not None:
-        config["enable_mqtt"] = bool(opts["mqtt_enabled"])
-    if opts.get("mqtt_broker"):
-        config["mqtt_broker"] = str(opts["mqtt_broker"])
-    if opts.get("mqtt_port") is not None:
-        try:
-            config["mqtt_port"] = int(opts["mqtt_port"])
-        except (ValueError, TypeError):
-            pass
-    if "mqtt_user" in opts:
-        config["mqtt_user"] = str(opts.get("mqtt_user", ""))
-    if "mqtt_pass" in opts:
-        config["mqtt_pass"] = str(opts.get("mqtt_pass", ""))
+    config.update(_load_options_json()[0])
     return config
 
 
@@ -362,8 +738,8 @@ def load_config():
     """Load the main configuration from config.json, with env var and options.json overrides."""
     if os.path.exists(CONFIG_FILE):
         try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+            with open(CONFIG_FILE, 'rb') as f:
+                config = json_loads(f.read())
         except (json.JSONDecodeError, IOError) as e:
             logger.error(f"Error loading config file: {e}")
             config = {}
@@ -402,40 +778,93 @@ def load_config():
     config = _apply_options_json_overrides(config)
     return _apply_env_overrides(config)
 
-def save_config(config_data):
-    """Save the configuration to config.json."""
-    tmp_path = f"{CONFIG_FILE}.tmp"
+def save_config(config_data, durable: bool = False):
+    """Save the configuration to config.json.
+
+    The write is atomic (temp file + os.replace) but not fsync'ed by default, since
+    admin actions save often and a flush costs tens of ms on SD cards. Pass
+    durable=True before events such as a system restart to force it to disk.
+    """
+    # config.json is machine-written; compact output is smaller and faster to produce.
+    # Sorted keys keep the file stable across saves.
+    data = json_dumps_bytes(config_data, sort_keys=True)
     try:
-        with open(tmp_path, 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, indent=2)
-        os.replace(tmp_path, CONFIG_FILE)
+        atomic_write_bytes(CONFIG_FILE, data, durable=durable)
     except OSError as e:
-        if e.errno in (errno.EBUSY, errno.EXDEV):
-            try:
-                with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(config_data, f, indent=2)
-                logger.warning("Atomic config replace failed; wrote directly to config.json.")
-            except OSError as inner:
-                logger.error(f"Error saving config file: {inner}")
-        else:
-            logger.error(f"Error saving config file: {e}")
-    finally:
-        try:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
-        except OSError:
-            pass
+        logger.error(f"Error saving config file: {e}")
+
+def build_plan_calendars(config_data: dict) -> Dict[str, List[dict]]:
+    """Map each plan key to its assigned calendar dicts, in calendar_urls order."""
+    calendars = config_data.get("calendar_urls", [])
+    plan_calendars = {}
+    for plan_key, assigned in (config_data.get("calendar_assignments", {}) or {}).items():
+        assigned_ids = set(assigned)
+        plan_calendars[plan_key] = [cal for cal in calendars if cal.get('id') in assigned_ids]
+    return plan_calendars
+
+def config_signature() -> tuple:
+    """Change token covering config.json and options.json, which both feed load_config()."""
+    return (file_signature(CONFIG_FILE), file_signature(OPTIONS_FILE))
 
 # Load initial configuration
-config = load_config()
+_cfg_signature = config_signature()
+_cfg_cache = load_config()
+_plan_to_cals = build_plan_calendars(_cfg_cache)
+
+
+_cfg_lock = threading.Lock()
+
+
+def get_config() -> dict:
+    """Return the parsed config, re-reading it only when config.json or options.json has changed on disk.
+
+    The returned dict is shared between request threads and must be treated as
+    read-only; code that changes settings works on its own load_config() copy.
+    """
+    global _cfg_cache, _cfg_signature, _plan_to_cals
+    signature = config_signature()
+    if signature != _cfg_signature:
+        with _cfg_lock:
+            # Another thread may have reloaded while we waited
+            if signature != _cfg_signature:
+                cfg = load_config()
+                _plan_to_cals = build_plan_calendars(cfg)
+                _cfg_cache = cfg
+                _cfg_signature = signature
+    return _cfg_cache
+
+
+_screensaver_cache = (None, ())  # (config dict the names were built from, names)
+_thread_rng = threading.local()
+
+
+def rng() -> random.Random:
+    """Return a per-thread Random instance for picking screensaver images."""
+    r = getattr(_thread_rng, "r", None)
+    if r is None:
+        r = _thread_rng.r = random.Random()
+    return r
+
+
+def get_active_screensaver_images(config_data: dict) -> tuple:
+    """Return filenames of active screensaver images; rebuilt only when get_config() has reloaded."""
+    global _screensaver_cache
+    cached = _screensaver_cache
+    if cached[0] is not config_data:
+        names = tuple(
+            item["filename"] for item in config_data.get("screensaver_config", []) if item.get("active", True)
+        )
+        # One tuple assignment, so other threads never see a mismatched pair
+        _screensaver_cache = cached = (config_data, names)
+    return cached[1]
 
 # --- Dynamic State (Last Updates) ---
-def load_last_updates() -> Dict[str, Optional[datetime]]:
+def load_last_updates(config_data: dict) -> Dict[str, Optional[datetime]]:
     """Load the last update timestamps for weekplans."""
     if os.path.exists(UPDATE_FILE):
         try:
-            with open(UPDATE_FILE, 'r') as f:
-                data = json.load(f)
+            with open(UPDATE_FILE, 'rb') as f:
+                data = json_loads(f.read())
             for key, value in data.items():
                 try:
                     data[key] = datetime.fromisoformat(value) if value else None
@@ -444,13 +873,12 @@ def load_last_updates() -> Dict[str, Optional[datetime]]:
             return data
         except (json.JSONDecodeError, IOError):
             pass
-    return {plan['key']: None for plan in config.get("weekplans", [])}
+    return {plan['key']: None for plan in config_data.get("weekplans", [])}
 
 def save_last_updates(updates_data):
     """Save the last update timestamps."""
     data_to_save = {key: dt.isoformat() if dt else "" for key, dt in updates_data.items()}
-    with open(UPDATE_FILE, 'w') as f:
-        json.dump(data_to_save, f, indent=2)
+    atomic_write_bytes(UPDATE_FILE, json_dumps_bytes(data_to_save, indent=True))
 
 
 def get_display_last_update(key: str) -> Optional[datetime]:
@@ -471,52 +899,183 @@ def get_display_last_update(key: str) -> Optional[datetime]:
     return datetime.fromtimestamp(latest_ts) if latest_ts is not None else None
 
 
-last_updates = load_last_updates()
+def _timestamps_for(updates: Dict[str, Optional[datetime]]) -> Dict[str, int]:
+    """Integer epoch seconds per plan key, used as the image cache-buster."""
+    return {key: int(dt.timestamp()) for key, dt in updates.items() if dt}
+
+
+_last_updates_signature = file_signature(UPDATE_FILE)
+last_updates = load_last_updates(_cfg_cache)
+last_update_timestamps = _timestamps_for(last_updates)
+
+
+def refresh_last_updates():
+    """Re-read last_updates.json when another worker (or process) has rewritten it."""
+    global last_updates, last_update_timestamps, _last_updates_signature
+    signature = file_signature(UPDATE_FILE)
+    if signature != _last_updates_signature:
+        last_updates = load_last_updates(get_config())
+        last_update_timestamps = _timestamps_for(last_updates)
+        _last_updates_signature = signature
+
+
+def record_last_update(key: str, dt: datetime):
+    """Record and persist a new upload time for a plan."""
+    last_updates[key] = dt
+    last_update_timestamps[key] = int(dt.timestamp())
+    save_last_updates(last_updates)
+
+# Whether a plan has a page-2 image, keyed by plan key and remembered together
+# with the last-update time it was checked for; a new upload invalidates it.
+_PAGE2_EXISTS: Dict[str, tuple] = {}
+
+
+def has_page2_image(key: str, last_update: Optional[datetime]) -> bool:
+    """Return whether the page-2 image exists for a plan, re-checking disk only after an update."""
+    cached = _PAGE2_EXISTS.get(key)
+    if cached is not None and cached[0] == last_update:
+        return cached[1]
+    exists = os.path.exists(os.path.join(STATIC_IMAGE_FOLDER, f"{key}-ukeplan-2.png"))
+    _PAGE2_EXISTS[key] = (last_update, exists)
+    return exists
+
+
+def get_plan_image_urls(key: str, dt: Optional[datetime], images_url: str) -> tuple:
+    """Return (page1_url, page2_url) for a plan; page2_url is empty when there is no second page."""
+    ts = last_update_timestamps.get(key)
+    if ts is None:
+        ts = int(dt.timestamp()) if dt else 0
+    page1_url = f"{images_url}{key}-ukeplan.png?v={ts}"
+    page2_url = f"{images_url}{key}-ukeplan-2.png?v={ts}" if has_page2_image(key, dt) else ""
+    return page1_url, page2_url
 
 # --- Dashboard Mode State ---
+_VALID_VIEWS = frozenset(("all", "plan1", "plan2"))
+_dashboard_mode_cache = {"signature": None, "data": {}}
+
+
+def _read_dashboard_mode() -> dict:
+    """Return the raw dashboard mode dict, re-reading the file only when it has changed."""
+    signature = file_signature(DASHBOARD_MODE_FILE)
+    if signature is None:
+        return {}
+    if signature != _dashboard_mode_cache["signature"]:
+        try:
+            with open(DASHBOARD_MODE_FILE, 'rb') as f:
+                data = json_loads(f.read())
+        except (json.JSONDecodeError, IOError):
+            data = {}
+        _dashboard_mode_cache["signature"] = signature
+        _dashboard_mode_cache["data"] = data
+    return _dashboard_mode_cache["data"]
+
 def set_forced_dashboard_until(dt: Optional[datetime], view: str = "all"):
     """Set the forced dashboard mode until a specific time and view (all|plan1|plan2)."""
-    if view not in ["all", "plan1", "plan2"]:
+    if view not in _VALID_VIEWS:
         view = "all"
     data = {"until": dt.isoformat() if dt else "", "view": view}
-    with open(DASHBOARD_MODE_FILE, 'w') as f:
-        json.dump(data, f)
-
-def get_forced_dashboard_until() -> Optional[datetime]:
-    """Get the time until which the dashboard is forced."""
-    if not os.path.exists(DASHBOARD_MODE_FILE):
-        return None
+    with open(DASHBOARD_MODE_FILE, 'wb') as f:
+        f.write(json_dumps_bytes(data))
+    _dashboard_mode_cache["signature"] = file_signature(DASHBOARD_MODE_FILE)
+    _dashboard_mode_cache["data"] = data
+
+def get_forced_dashboard_mode(default_view: str = "all") -> tuple:
+    """Return (until, view) for the forced dashboard mode from a single read of the mode file."""
+    data = _read_dashboard_mode()
     try:
-        with open(DASHBOARD_MODE_FILE, 'r') as f:
-            data = json.load(f)
         until = data.get("until")
-        return datetime.fromisoformat(until) if until else None
-    except (json.JSONDecodeError, ValueError, IOError):
+        until = datetime.fromisoformat(until) if until else None
+    except (ValueError, TypeError):
+        until = None
+    view = data.get("view", default_view)
+    return until, view if view in _VALID_VIEWS else default_view
+
+class AppJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider using json_dumps_bytes/json_loads (orjson when installed),
+    so jsonify() follows the same encoding rules as the state files."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return json_dumps_bytes(obj, indent=bool(kwargs.get("indent")),
+                                sort_keys=kwargs.get("sort_keys", self.sort_keys)).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return json_loads(s)
+
+
+# Static subfolders whose files may be cached by clients, and for how long (seconds)
+STATIC_CACHEABLE_PREFIXES = ('images/', 'screensaver/')
+STATIC_IMAGE_MAX_AGE = 3600
+
+
+class WeekplansFlask(Flask):
+    """Flask app that only lets clients cache image static files.
+
+    Weekplan PNG URLs carry a ?v= cache buster and screensaver images are never
+    rewritten under the same name. The JS files are replaced on every container
+    start without a cache buster, so they are always revalidated.
+    """
+
+    def get_send_file_max_age(self, filename: Optional[str]) -> Optional[int]:
+        if filename and filename.startswith(STATIC_CACHEABLE_PREFIXES):
+            return STATIC_IMAGE_MAX_AGE
         return None
 
-def get_forced_dashboard_view(default_view: str = "all") -> str:
-    if not os.path.exists(DASHBOARD_MODE_FILE):
-        return default_view
-    try:
-        with open(DASHBOARD_MODE_FILE, 'r') as f:
-            data = json.load(f)
-        view = data.get("view", default_view)
-        return view if view in ["all", "plan1", "plan2"] else default_view
-    except (json.JSONDecodeError, IOError):
-        return default_view
 
-app = Flask(__name__, static_folder=STATIC_FOLDER)
+app = WeekplansFlask(__name__, static_folder=STATIC_FOLDER)
+app.json = AppJSONProvider(app)
+# API responses are read by the dashboard JS only; skip key sorting and indentation
+app.json.sort_keys = False
+app.json.compact = True
+
+
+def _json_response(obj, conditional: bool = False):
+    """Wrap obj serialized straight to bytes in a JSON response, bypassing the jsonify() str round-trip.
+
+    With conditional=True the response carries a content ETag and is turned into an
+    empty 304 when the client's If-None-Match matches, so polling clients only
+    download a payload when it has changed.
+    """
+    response = app.response_class(json_dumps_bytes(obj), mimetype='application/json')
+    if conditional:
+        response.add_etag()
+        # Let browsers keep the body but revalidate on every poll
+        response.headers['Cache-Control'] = 'no-cache'
+        response.make_conditional(request)
+    return response
+
+
+# Weekday and month names per dashboard language. Dates are formatted from these
+# tables rather than via locale.setlocale(), which is process-wide and not thread-safe.
+DATE_NAMES = {
+    "en-GB": (
+        WEEKDAY_NAMES,
+        ("January", "February", "March", "April", "May", "June", "July",
+         "August", "September", "October", "November", "December"),
+    ),
+    "nb-NO": (
+        ("mandag", "tirsdag", "onsdag", "torsdag", "fredag", "lørdag", "søndag"),
+        ("januar", "februar", "mars", "april", "mai", "juni", "juli",
+         "august", "september", "oktober", "november", "desember"),
+    ),
+}
+_VALID_LANGS = frozenset(DATE_NAMES)
+
+
+def get_date_names(config_data: dict) -> tuple:
+    """Return (weekday_names, month_names) for the configured dashboard language."""
+    return DATE_NAMES.get(config_data.get("dashboard_language"), DATE_NAMES["en-GB"])
 
 
-def format_last_update_header(dt: Optional[datetime]) -> str:
+def format_last_update_header(dt: Optional[datetime], config_data: dict) -> str:
     """Format datetime like the dashboard header: 'mandag 9. mars, 17:45:39'."""
     if dt is None:
         return "—"
-    s = f"{dt.strftime('%A')} {dt.day}. {dt.strftime('%B')}, {dt.strftime('%H:%M:%S')}"
+    weekdays, months = get_date_names(config_data)
+    s = f"{weekdays[dt.weekday()]} {dt.day}. {months[dt.month - 1]}, {dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}"
     return s[0].upper() + s[1:] if s else "—"
 
 
-app.jinja_env.filters["format_last_update"] = lambda dt: format_last_update_header(dt) if dt else "—"
+app.jinja_env.filters["format_last_update"] = lambda dt, config_data: format_last_update_header(dt, config_data) if dt else "—"
 
 # Configure Flask for large file uploads (50MB max)
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB
@@ -551,16 +1110,96 @@ app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
 
 
 @app.before_request
-def refresh_config():
-    """Reload config per request to avoid stale worker state."""
-    global config
+def refresh_shared_state():
+    """Pick up upload state written by other workers; the file is only re-read when it changes.
+
+    Config is not refreshed here: each route takes its own get_config() snapshot.
+    """
     if request.endpoint == 'static':
         return
-    config = load_config()
+    refresh_last_updates()
+
 
 # --- MQTT Setup (optional) ---
+@lru_cache(maxsize=1)
+def _ha_discovery_messages(hostname: str, sw_version: str) -> tuple:
+    """Build the Home Assistant discovery (topic, button name, JSON payload) triples once per host/version."""
+    device_name = f"Weekplans {hostname}"
+    device_id = f"weekplans_{hostname}".replace("-", "_")
+    
+    # Device info
+    device_info = {
+        "identifiers": [device_id],
+        "name": device_name,
+        "manufacturer": "Weekplans App",
+        "model": "Weekplans Dashboard",
+        "sw_version": sw_version
+    }
+    
+    # Button configurations for each weekplan view
+    buttons = [
+        {
+            "name": "Show All Weekplans",
+            "command_topic": "pi/weekplan/command",
+            "payload_press": "all",
+            "unique_id": f"{device_id}_show_all"
+        },
+        {
+            "name": "Show Julie's Weekplan",
+            "command_topic": "pi/weekplan/command", 
+            "payload_press": "plan1",
+            "unique_id": f"{device_id}_show_plan1"
+        },
+        {
+            "name": "Show Emil's Weekplan",
+            "command_topic": "pi/weekplan/command",
+            "payload_press": "plan2", 
+            "unique_id": f"{device_id}_show_plan2"
+        }
+    ]
+    
+    messages = []
+    for button in buttons:
+        discovery_topic = f"homeassistant/button/{button['unique_id']}/config"
+        discovery_payload = {
+            "name": button["name"],
+            "command_topic": button["command_topic"],
+            "payload_press": button["payload_press"],
+            "unique_id": button["unique_id"],
+            "device": device_info,
+            "icon": "mdi:calendar-week"
+        }
+        messages.append((discovery_topic, button["name"], json_dumps_bytes(discovery_payload)))
+    return tuple(messages)
+
 mqtt_client = None
-if config.get("enable_mqtt"):
+# Connection state maintained by the on_connect/on_disconnect callbacks, so
+# request handlers can check it without taking the Paho client lock.
+_mqtt_connected = False
+# Command publishes are handed to a background thread so admin requests never
+# wait on the Paho client lock or a full socket buffer.
+MQTT_PUBLISH_QUEUE_SIZE = 256
+_publish_queue = queue.Queue(maxsize=MQTT_PUBLISH_QUEUE_SIZE)
+
+
+def _mqtt_publish_worker():
+    """Drain the publish queue, sending each command at QoS 0."""
+    while True:
+        topic, payload = _publish_queue.get()
+        try:
+            mqtt_client.publish(topic, payload, qos=0, retain=False)
+        except Exception as e:
+            logger.error(f"Error publishing to {topic}: {e}")
+
+
+def mqtt_publish(topic: str, payload: str):
+    """Queue a fire-and-forget command publish; drops it if the queue is full."""
+    try:
+        _publish_queue.put_nowait((topic, payload))
+    except queue.Full:
+        logger.warning(f"MQTT publish queue full; dropped command for {topic}")
+
+if _cfg_cache.get("enable_mqtt"):
     try:
         import paho.mqtt.client as mqtt
         import socket
@@ -576,64 +1215,15 @@ if config.get("enable_mqtt"):
             mqtt_client = mqtt.Client(client_id=client_id)
 
         # Set credentials if provided
-        if config.get("mqtt_user"):
-            mqtt_client.username_pw_set(config.get("mqtt_user", ""), config.get("mqtt_pass", ""))
-
-        # Local state holder for connection
-        _mqtt_connected_flag = {"val": False}
+        if _cfg_cache.get("mqtt_user"):
+            mqtt_client.username_pw_set(_cfg_cache.get("mqtt_user", ""), _cfg_cache.get("mqtt_pass", ""))
 
         def _publish_ha_discovery(client):
             """Publish Home Assistant MQTT Discovery messages for weekplan buttons."""
             try:
-                import socket
-                device_name = f"Weekplans {socket.gethostname()}"
-                device_id = f"weekplans_{socket.gethostname()}".replace("-", "_")
-                
-                # Device info
-                device_info = {
-                    "identifiers": [device_id],
-                    "name": device_name,
-                    "manufacturer": "Weekplans App",
-                    "model": "Weekplans Dashboard",
-                    "sw_version": get_app_version()
-                }
-                
-                # Button configurations for each weekplan view
-                buttons = [
-                    {
-                        "name": "Show All Weekplans",
-                        "command_topic": "pi/weekplan/command",
-                        "payload_press": "all",
-                        "unique_id": f"{device_id}_show_all"
-                    },
-                    {
-                        "name": "Show Julie's Weekplan",
-                        "command_topic": "pi/weekplan/command", 
-                        "payload_press": "plan1",
-                        "unique_id": f"{device_id}_show_plan1"
-                    },
-                    {
-                        "name": "Show Emil's Weekplan",
-                        "command_topic": "pi/weekplan/command",
-                        "payload_press": "plan2", 
-                        "unique_id": f"{device_id}_show_plan2"
-                    }
-                ]
-                
-                # Publish discovery messages for each button
-                for button in buttons:
-                    discovery_topic = f"homeassistant/button/{button['unique_id']}/config"
-                    discovery_payload = {
-                        "name": button["name"],
-                        "command_topic": button["command_topic"],
-                        "payload_press": button["payload_press"],
-                        "unique_id": button["unique_id"],
-                        "device": device_info,
-                        "icon": "mdi:calendar-week"
-                    }
-                    
-                    client.publish(discovery_topic, json.dumps(discovery_payload), qos=1, retain=True)
-                    logger.info(f"Published HA discovery for button: {button['name']}")
+                for topic, name, payload in _ha_discovery_messages(socket.gethostname(), get_app_version()):
+                    client.publish(topic, payload, qos=1, retain=True)
+                    logger.info(f"Published HA discovery for button: {name}")
                 
                 logger.info("Home Assistant MQTT Discovery messages published successfully")
                 
@@ -641,9 +1231,10 @@ if config.get("enable_mqtt"):
                 logger.error(f"Error publishing HA discovery messages: {e}")
 
         def _on_connect(client, userdata, flags, rc):
+            global _mqtt_connected
             try:
                 logger.info(f"Connected to MQTT broker with result code {rc}")
-                _mqtt_connected_flag["val"] = True
+                _mqtt_connected = rc == 0
                 # Subscribe to state topics (read-only)
                 client.subscribe("pi/display/state")
                 client.subscribe("pi/browser/current_url")
@@ -657,7 +1248,8 @@ if config.get("enable_mqtt"):
                 logger.error(f"Error in MQTT on_connect: {e}")
 
         def _on_disconnect(client, userdata, rc):
-            _mqtt_connected_flag["val"] = False
+            global _mqtt_connected
+            _mqtt_connected = False
             logger.warning(f"Disconnected from MQTT broker (rc={rc})")
 
         def _on_message(client, userdata, msg):
@@ -671,9 +1263,9 @@ if config.get("enable_mqtt"):
                 # Handle weekplan commands
                 elif topic == "pi/weekplan/command":
                     logger.info(f"Received weekplan command: {payload}")
-                    duration = config.get("dashboard_duration", 10)
+                    duration = get_config().get("dashboard_duration", 10)
                     view = payload.strip().lower()
-                    if view not in ['all', 'plan1', 'plan2']:
+                    if view not in _VALID_VIEWS:
                         view = 'all'
                     set_forced_dashboard_until(datetime.now() + timedelta(seconds=duration), view=view)
                     logger.info(f"Set dashboard mode: {view} for {duration} seconds")
@@ -686,13 +1278,14 @@ if config.get("enable_mqtt"):
 
         # Connect and start background loop
         try:
-            mqtt_client.connect(config.get("mqtt_broker", "localhost"), int(config.get("mqtt_port", 1883)))
+            mqtt_client.connect(_cfg_cache.get("mqtt_broker", "localhost"), int(_cfg_cache.get("mqtt_port", 1883)))
             mqtt_client.loop_start()
+            threading.Thread(target=_mqtt_publish_worker, name='mqtt-publish', daemon=True).start()
         except Exception as e:
             logger.error(f"Failed to connect to MQTT broker: {e}")
     except ImportError:
         logger.warning("paho-mqtt library not found. MQTT is disabled.")
-        config["enable_mqtt"] = False
+        _cfg_cache["enable_mqtt"] = False  # still single-threaded at import
 
 # Mock MQTT stats for demonstration if MQTT is disabled
 mqtt_stats = {
@@ -702,32 +1295,42 @@ mqtt_stats = {
 }
 
 # --- Routes ---
+# Single-slot memo: (whole second, date names, (date_str, time_str))
+_header_clock_cache = None
+
+
+def get_header_clock(config_data: dict) -> tuple:
+    """Return the dashboard header (date_str, time_str), reused for requests within the same second."""
+    global _header_clock_cache
+    second = int(time.time())
+    names = get_date_names(config_data)
+    cached = _header_clock_cache
+    if cached is not None and cached[0] == second and cached[1] is names:
+        return cached[2]
+    now = datetime.fromtimestamp(second)
+    weekdays, months = names
+    result = (
+        f"{weekdays[now.weekday()]} {now.day} {months[now.month - 1]}".capitalize(),
+        f"{now.hour:02d}:{now.minute:02d}:{now.second:02d}",
+    )
+    _header_clock_cache = (second, names, result)
+    return result
+
+
 @app.route('/')
 def root():
     """Renders the main dashboard page."""
-    now = datetime.now()
-    try:
-        loc = "nb_NO.UTF-8" if config.get("dashboard_language") == "nb-NO" else "en_GB.UTF-8"
-        locale.setlocale(locale.LC_TIME, loc)
-    except locale.Error:
-        try:
-            locale.setlocale(locale.LC_TIME, "")
-        except locale.Error:
-            pass
-
-    date_str = now.strftime("%A %-d %B").capitalize()
-    time_str = now.strftime("%H:%M:%S")
+    cfg = get_config()
+    date_str, time_str = get_header_clock(cfg)
     
     plan_updates = []
     user_views = {}
-    for plan in config.get("weekplans", []):
+    images_url = url_for('static', filename='images/')
+    for plan in cfg.get("weekplans", []):
         key = plan['key']
         dt = get_display_last_update(key)
-        update_str = format_last_update_header(dt) if dt else "—"
-        ts = int(dt.timestamp()) if dt else 0
-        page1_url = url_for('static', filename=f'images/{key}-ukeplan.png') + f'?v={ts}'
-        page2_path = os.path.join(STATIC_IMAGE_FOLDER, f"{key}-ukeplan-2.png")
-        page2_url = url_for('static', filename=f'images/{key}-ukeplan-2.png') + f'?v={ts}' if os.path.exists(page2_path) else ""
+        update_str = format_last_update_header(dt, cfg) if dt else "—"
+        page1_url, page2_url = get_plan_image_urls(key, dt, images_url)
         display_page = int(plan.get('display_page', 1))
         selected_img = page1_url if display_page != 2 or not page2_url else page2_url
         plan_updates.append({
@@ -746,10 +1349,10 @@ def root():
             'img_page2_url': page2_url
         }
         
-    active_screensaver_images = [item["filename"] for item in config.get("screensaver_config", []) if item.get("active", True)]
+    active_screensaver_images = get_active_screensaver_images(cfg)
     screensaver_image_url = ""
     if active_screensaver_images:
-        chosen_image = random.choice(active_screensaver_images)
+        chosen_image = active_screensaver_images[rng().randrange(len(active_screensaver_images))]
         screensaver_image_url = url_for('static', filename=f'screensaver/{chosen_image}')
         
     return render_template(
@@ -770,26 +1373,33 @@ def api_exit_dashboard():
 @app.route("/mode")
 def mode():
     """API endpoint to check if the dashboard should be displayed."""
-    until = get_forced_dashboard_until()
+    cfg = get_config()
+    until, forced_view = get_forced_dashboard_mode("all")
     mode_active = until is not None and datetime.now() < until
-    view = get_forced_dashboard_view("all") if mode_active else "all"
-    enable_calendar = config.get("enable_calendar", True)
-    has_calendars = len(config.get("calendar_urls", [])) > 0
+    view = forced_view if mode_active else "all"
+    enable_calendar = cfg.get("enable_calendar", True)
+    has_calendars = bool(cfg.get("calendar_urls"))
     show_calendar = enable_calendar and has_calendars
     return jsonify({
         "dashboard": mode_active,
         "view": view,
-        "language": config.get("dashboard_language", "en-GB"),
-        "weekplan_layout": config.get("weekplan_layout", "full"),
-        "simple_layout_nav_button_size": max(24, min(96, int(config.get("simple_layout_nav_button_size", 48)))),
+        "language": cfg.get("dashboard_language", "en-GB"),
+        "weekplan_layout": cfg.get("weekplan_layout", "full"),
+        "simple_layout_nav_button_size": max(24, min(96, int(cfg.get("simple_layout_nav_button_size", 48)))),
         "enable_calendar": enable_calendar,
         "show_calendar": show_calendar
     })
 
+# Allowed screensaver button font colors and button bar positions
+_FONT_COLORS = frozenset(("auto", "white", "black"))
+_HORIZ = frozenset(("left", "center", "right"))
+_VERT = frozenset(("top", "center", "bottom"))
+
 @app.route("/api/screensaver_buttons")
 def api_screensaver_buttons():
     """Return screensaver button configuration for the display."""
-    buttons = list(config.get("screensaver_buttons", []))
+    cfg = get_config()
+    buttons = list(cfg.get("screensaver_buttons", []))
     defaults = [
         {"enabled": False, "label": "Show Weekplan 1", "action": "plan1", "use_custom_color": False, "color": "#ffffff", "font_color": "auto"},
         {"enabled": False, "label": "Show Weekplan 2", "action": "plan2", "use_custom_color": False, "color": "#ffffff", "font_color": "auto"},
@@ -802,7 +1412,7 @@ def api_screensaver_buttons():
         else:
             b = buttons[i]
             fc = b.get("font_color", "auto")
-            if fc not in ("auto", "white", "black"):
+            if fc not in _FONT_COLORS:
                 fc = "auto"
             btn = {
                 "enabled": bool(b.get("enabled", False)),
@@ -816,19 +1426,19 @@ def api_screensaver_buttons():
             if b.get("action") == "url":
                 btn["target_top"] = bool(b.get("target_top", False))
             buttons[i] = btn
-    pos = config.get("screensaver_buttons_position", {}) or {}
+    pos = cfg.get("screensaver_buttons_position", {}) or {}
     h = pos.get("horizontal", "center")
     v = pos.get("vertical", "bottom")
-    if h not in ("left", "center", "right"):
+    if h not in _HORIZ:
         h = "center"
-    if v not in ("top", "center", "bottom"):
+    if v not in _VERT:
         v = "bottom"
     use_custom_height = bool(pos.get("use_custom_height", False))
     try:
         height_px = max(24, min(200, int(pos.get("height_px", 44))))
     except (TypeError, ValueError):
         height_px = 44
-    return jsonify({
+    return _json_response({
         "buttons": buttons[:4],
         "position": {"horizontal": h, "vertical": v, "use_custom_height": use_custom_height, "height_px": height_px}
     })
@@ -836,26 +1446,25 @@ def api_screensaver_buttons():
 @app.route("/screensaver_image")
 def screensaver_image():
     """API endpoint to get a random screensaver image URL."""
-    active_images = [item["filename"] for item in config.get("screensaver_config", []) if item.get("active", True)]
+    active_images = get_active_screensaver_images(get_config())
     if not active_images:
-        return jsonify({"image_url": ""})
+        return _json_response({"image_url": ""})
     
-    chosen = random.choice(active_images)
+    chosen = active_images[rng().randrange(len(active_images))]
     image_url = url_for('static', filename=f'screensaver/{chosen}')
-    return jsonify({"image_url": image_url})
+    return _json_response({"image_url": image_url})
 
 # --- API: Weekplans for React frontend ---
 @app.route("/api/weekplans", methods=["GET"])
 def api_weekplans():
     """Return list of weekplans with selected image (all view) and explicit page1/page2 URLs."""
+    cfg = get_config()
     result = []
-    for plan in config.get("weekplans", []):
+    images_url = url_for('static', filename='images/')
+    for plan in cfg.get("weekplans", []):
         key = plan['key']
         dt = get_display_last_update(key)
-        ts = int(dt.timestamp()) if dt else 0
-        page1_url = url_for('static', filename=f'images/{key}-ukeplan.png') + f'?v={ts}'
-        img2_path = os.path.join(STATIC_IMAGE_FOLDER, f"{key}-ukeplan-2.png")
-        page2_url = url_for('static', filename=f'images/{key}-ukeplan-2.png') + f'?v={ts}' if os.path.exists(img2_path) else ""
+        page1_url, page2_url = get_plan_image_urls(key, dt, images_url)
         display_page = int(plan.get('display_page', 1))
         img_url = page1_url if display_page != 2 or not page2_url else page2_url
         result.append({
@@ -870,75 +1479,424 @@ def api_weekplans():
             "page1_url": page1_url,
             "page2_url": page2_url
         })
-    return jsonify(result)
+    return _json_response(result, conditional=True)
+
+_START_KEY = itemgetter('start_datetime')
+
+def fetch_calendars_events(calendars: List[Dict], days_ahead: int) -> List[Dict]:
+    """Fetch several calendars concurrently and return their events tagged and sorted by start time."""
+    futures = []
+    for calendar_config in calendars:
+        url = calendar_config.get('url', '')
+        if not url:
+            continue
+        name = calendar_config.get('name', 'Calendar')
+        color = calendar_config.get('color', '#3788d8')  # Default blue color
+        logger.info("Processing calendar: %s", name)
+        futures.append(CAL_POOL.submit(fetch_calendar_events, url, days_ahead, name, color))
+
+    all_events: List[Dict] = []
+    # Collect in submission order so events with equal start times keep a stable order
+    for future in futures:
+        all_events.extend(future.result())
+
+    # Sort all events by start time
+    all_events.sort(key=_START_KEY)
+    return all_events
 
 @app.route("/api/calendar/events", methods=["GET"])
 def api_calendar_events():
     """Return calendar events from all configured URLs for the next 2 weeks."""
-    if not config.get("enable_calendar", True):
-        return jsonify([])
-    all_events = []
-    calendar_urls = config.get("calendar_urls", [])
+    cfg = get_config()
+    if not cfg.get("enable_calendar", True):
+        return _json_response([])
+    calendar_urls = cfg.get("calendar_urls", [])
     
-    logger.info(f"Processing {len(calendar_urls)} calendar URLs")
+    logger.info("Processing %d calendar URLs", len(calendar_urls))
     
-    for calendar_config in calendar_urls:
-        url = calendar_config.get('url', '')
-        name = calendar_config.get('name', 'Calendar')
-        color = calendar_config.get('color', '#3788d8')  # Default blue color
-        if url:
-            logger.info(f"Processing calendar: {name}")
-            # Admin panel should show next 2 weeks
-            events = fetch_calendar_events(url, days_ahead=14)
-            for event in events:
-                event['calendar_name'] = name
-                event['calendar_color'] = color
-            all_events.extend(events)
-    
-    # Sort all events by start time
-    all_events.sort(key=lambda x: x['start_datetime'])
+    # Admin panel should show next 2 weeks
+    all_events = fetch_calendars_events(calendar_urls, days_ahead=14)
     
-    logger.info(f"Returning {len(all_events)} total events")
-    return jsonify(all_events)
+    logger.info("Returning %d total events", len(all_events))
+    return _json_response(all_events, conditional=True)
 
 @app.route("/api/calendar/events_for/<plan_key>", methods=["GET"])
 def api_calendar_events_for(plan_key: str):
     """Return calendar events assigned to a specific plan (user) for today + next 3 days."""
-    if not config.get("enable_calendar", True):
-        return jsonify([])
-    assignments_map = config.get("calendar_assignments", {}) or {}
-    assigned_ids = set(assignments_map.get(plan_key, []))
-    all_events: List[Dict] = []
-    if not assigned_ids:
-        return jsonify([])
-
-    calendars = config.get("calendar_urls", [])
-    for calendar in calendars:
-        cal_id = calendar.get('id')
-        if cal_id in assigned_ids:
-            url = calendar.get('url', '')
-            name = calendar.get('name', 'Calendar')
-            color = calendar.get('color', '#3788d8')
-            if not url:
-                continue
-            events = fetch_calendar_events(url, days_ahead=3)  # today + next 3 days
-            for event in events:
-                event['calendar_name'] = name
-                event['calendar_color'] = color
-            all_events.extend(events)
+    cfg = get_config()
+    if not cfg.get("enable_calendar", True):
+        return _json_response([])
+    calendars = _plan_to_cals.get(plan_key)
+    if not calendars:
+        return _json_response([])
 
-    all_events.sort(key=lambda x: x['start_datetime'])
-    return jsonify(all_events)
+    all_events = fetch_calendars_events(calendars, days_ahead=3)  # today + next 3 days
+    return _json_response(all_events, conditional=True)
 
 @app.route("/api/calendar/debug/<path:calendar_url>", methods=["GET"])
 def api_calendar_debug(calendar_url):
     """Debug endpoint is intentionally disabled in production."""
     abort(404)
 
+# --- Admin action handlers ---
+# Each handler applies one admin form action to ``config`` and returns True
+# when the config was modified and needs to be saved.
+
+def _handle_upload_pdf(config, form):
+    """Stores an uploaded weekplan PDF and renders its pages to images."""
+    file = request.files.get('pdf_file')
+    target = form.get('target', 'plan1')
+    allowed_targets = {plan.get('key') for plan in config.get("weekplans", []) if plan.get('key')}
+    if target not in allowed_targets:
+        logger.warning(f"Rejected upload_pdf target: {target!r}")
+    elif file and file.filename and allowed_file(file.filename, ALLOWED_PDF_EXTENSIONS):
+        filename = secure_filename(f"{target}.pdf")
+        filepath = os.path.join(UPLOAD_FOLDER, filename)
+        save_upload(file, filepath)
+        try:
+            if render_pdf_pages(filepath, target):
+                record_last_update(target, datetime.now())
+                _PAGE2_EXISTS.pop(target, None)
+        except Exception as e:
+            logger.error(f"Error converting PDF: {e}")
+    return False
+
+def _handle_upload_screensaver_file(config, form):
+    """Stores an uploaded screensaver image."""
+    file = request.files.get('screensaver_file')
+    if file and file.filename and allowed_file(file.filename, ALLOWED_IMAGE_EXTENSIONS):
+        filename = secure_filename(file.filename)
+        if not any(d.get('filename') == filename for d in config["screensaver_config"]):
+            save_upload(file, os.path.join(SCREENSAVER_FOLDER, filename))
+            config["screensaver_config"].append({"filename": filename, "active": True})
+            return True
+    return False
+
+def _handle_upload_screensaver_url(config, form):
+    """Downloads a screensaver image from a URL."""
+    url = form.get('screensaver_url')
+    if not url:
+        return False
+    try:
+        parsed_url = urlparse(url)
+        if parsed_url.scheme not in _ALLOWED_SCHEMES or not parsed_url.netloc:
+            raise ValueError("Invalid URL provided")
+        with HTTP_SESSION.get(url, stream=True, timeout=10) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('content-type', '').split(';')[0]
+            if not content_type.startswith('image/'):
+                 raise ValueError(f"Invalid content type: {content_type}")
+            content_length = response.headers.get('content-length', '')
+            if content_length.isdigit() and int(content_length) > MAX_SCREENSAVER_DOWNLOAD_BYTES:
+                raise ValueError(f"Image too large: {content_length} bytes")
+            filename = secure_filename(os.path.basename(parsed_url.path) or f"downloaded_{uuid.uuid4().hex[:8]}.jpg")
+            if not allowed_file(filename, ALLOWED_IMAGE_EXTENSIONS):
+                ext = content_type.split('/')[-1]
+                valid_ext = ext if ext in ['jpeg', 'jpg', 'png', 'gif', 'webp'] else 'jpg'
+                filename = f"{os.path.splitext(filename)[0]}.{valid_ext}"
+            if not any(d.get('filename') == filename for d in config["screensaver_config"]):
+                filepath = os.path.join(SCREENSAVER_FOLDER, filename)
+                download_to_file(response, filepath, MAX_SCREENSAVER_DOWNLOAD_BYTES)
+                config["screensaver_config"].append({"filename": filename, "active": True})
+                return True
+    except (requests.RequestException, ValueError) as e:
+        logger.error(f"Error downloading from URL {redact_url_for_log(url)}: {e}")
+    return False
+
+def _handle_delete_screensaver(config, form):
+    """Deletes a screensaver image and its config entry."""
+    filename = form.get('filename')
+    if not filename:
+        return False
+    # Stored names were sanitized on upload; only unknown names need secure_filename
+    entries = config["screensaver_config"]
+    if '/' not in filename and any(item['filename'] == filename for item in entries):
+        safe_filename = filename
+    else:
+        safe_filename = secure_filename(filename)
+    filepath = os.path.join(SCREENSAVER_FOLDER, safe_filename)
+    try:
+        os.remove(filepath)
+    except FileNotFoundError:
+        pass
+    entries[:] = [item for item in entries if item['filename'] != safe_filename]
+    return True
+
+def _handle_update_screensaver_activation(config, form):
+    """Marks the checked screensaver images as active."""
+    active_images = set(form.getlist('active_images'))
+    for item in config["screensaver_config"]:
+        item['active'] = item['filename'] in active_images
+    return True
+
+def _handle_show_week_plan(config, form):
+    """Forces the dashboard to show the weekplan for the configured duration."""
+    duration = config.get("dashboard_duration", 10)
+    view = form.get('view', 'all')
+    if view not in _VALID_VIEWS:
+        view = 'all'
+    set_forced_dashboard_until(datetime.now() + timedelta(seconds=duration), view=view)
+    return False
+
+def _handle_set_display_pages(config, form):
+    """Saves which page to show in "All" view per plan (priority page)."""
+    for plan in config.get('weekplans', []):
+        key = plan['key']
+        val = form.get(f'display_page_{key}', str(plan.get('display_page', 1)))
+        try:
+            page_num = int(val)
+            plan['display_page'] = 2 if page_num == 2 else 1
+        except ValueError:
+            plan['display_page'] = 1
+    return True
+
+def _handle_set_weekplan_layout(config, form):
+    """Saves the weekplan layout and simple layout nav button size."""
+    layout = form.get('weekplan_layout', 'full')
+    if layout in ('full', 'simple'):
+        config['weekplan_layout'] = layout
+    try:
+        size = max(24, min(96, int(form.get('simple_layout_nav_button_size', 48))))
+        config['simple_layout_nav_button_size'] = size
+    except (ValueError, TypeError):
+        pass
+    return True
+
+def _handle_set_duration(config, form):
+    """Saves the dashboard duration and language."""
+    config['dashboard_duration'] = int(form.get('dashboard_duration', 10))
+    # Also allow saving language in this general form
+    lang = form.get('dashboard_language')
+    if lang in _VALID_LANGS:
+        config['dashboard_language'] = lang
+    return True
+
+def _handle_set_weekplan_details(config, form):
+    """Saves weekplan names and icons."""
+    for plan in config.get('weekplans', []):
+        plan['name'] = form.get(f"name_{plan['key']}", plan['name'])
+        plan['icon'] = form.get(f"icon_{plan['key']}", plan['icon'])
+        plan['enable_icon'] = f"enable_icon_{plan['key']}" in form
+    return True
+
+def _handle_set_screensaver_buttons(config, form):
+    """Saves the screensaver overlay buttons and their position."""
+    defaults = [
+        {"enabled": False, "label": "Show Weekplan 1", "action": "plan1", "use_custom_color": False, "color": "#ffffff", "font_color": "auto"},
+        {"enabled": False, "label": "Show Weekplan 2", "action": "plan2", "use_custom_color": False, "color": "#ffffff", "font_color": "auto"},
+        {"enabled": False, "label": "Show both weekplans", "action": "all", "use_custom_color": False, "color": "#ffffff", "font_color": "auto"},
+        {"enabled": False, "label": "Custom URL", "action": "url", "url": "", "target_top": False, "use_custom_color": False, "color": "#ffffff", "font_color": "auto"},
+    ]
+    buttons = []
+    for i, d in enumerate(defaults):
+        enabled = f"screensaver_btn_{i}_enabled" in form
+        label = form.get(f"screensaver_btn_{i}_label", d["label"]).strip() or d["label"]
+        action = d["action"]
+        url = form.get(f"screensaver_btn_{i}_url", "").strip() if action == "url" else ""
+        use_custom_color = f"screensaver_btn_{i}_use_custom_color" in form
+        color = form.get(f"screensaver_btn_{i}_color", "#ffffff").strip() or "#ffffff"
+        font_color = form.get(f"screensaver_btn_{i}_font_color", "auto")
+        if font_color not in _FONT_COLORS:
+            font_color = "auto"
+        btn = {"enabled": enabled, "label": label, "action": action, "use_custom_color": use_custom_color, "color": color, "font_color": font_color}
+        if action == "url":
+            btn["url"] = url
+            btn["target_top"] = f"screensaver_btn_{i}_target_top" in form
+        buttons.append(btn)
+    config["screensaver_buttons"] = buttons
+    h = form.get("screensaver_buttons_horizontal", "center")
+    v = form.get("screensaver_buttons_vertical", "bottom")
+    if h not in _HORIZ:
+        h = "center"
+    if v not in _VERT:
+        v = "bottom"
+    use_custom_height = "screensaver_buttons_use_custom_height" in form
+    try:
+        height_px = max(24, min(200, int(form.get("screensaver_buttons_height_px", 44))))
+    except (TypeError, ValueError):
+        height_px = 44
+    config["screensaver_buttons_position"] = {"horizontal": h, "vertical": v, "use_custom_height": use_custom_height, "height_px": height_px}
+    return True
+
+def _handle_set_mqtt_config(config, form):
+    """Saves MQTT settings that are not controlled by env or options.json."""
+    env_controlled = get_mqtt_env_controlled()
+    options_controlled = get_mqtt_options_controlled()
+    externally_controlled = env_controlled | options_controlled
+    if 'enable_mqtt' not in externally_controlled:
+        config['enable_mqtt'] = 'enable_mqtt' in form
+    if 'mqtt_broker' not in externally_controlled:
+        config['mqtt_broker'] = form.get('mqtt_broker', 'homeassistant.local')
+    if 'mqtt_port' not in externally_controlled:
+        config['mqtt_port'] = int(form.get('mqtt_port', 1883))
+    if 'mqtt_user' not in externally_controlled:
+        config['mqtt_user'] = form.get('mqtt_user', '')
+    if 'mqtt_pass' not in externally_controlled:
+        config['mqtt_pass'] = form.get('mqtt_pass', '')
+    return True
+
+def _handle_set_calendar_enabled(config, form):
+    """Toggles the calendar feature."""
+    config['enable_calendar'] = 'enable_calendar' in form
+    return True
+
+def _handle_set_calendar_assignments(config, form):
+    """Saves which calendars are assigned to each plan."""
+    # For each plan, read selected calendar IDs
+    assignments: Dict[str, List[str]] = {}
+    calendar_ids = frozenset(cal.get('id') for cal in config.get('calendar_urls') or () if cal.get('id'))
+    for plan in config.get('weekplans', []):
+        key = plan['key']
+        selected = [cid for cid in form.getlist(f'assign_{key}') if cid in calendar_ids]
+        assignments[key] = selected
+    if assignments == config.get('calendar_assignments'):
+        return False
+    config['calendar_assignments'] = assignments
+    logger.info(f"Saved calendar assignments for {len(assignments)} plans")
+    return True
+
+def _handle_add_calendar(config, form):
+    """Adds an iCal calendar unless its URL is already configured."""
+    calendar_name = form.get('calendar_name', '').strip()
+    calendar_url = form.get('calendar_url', '').strip()
+    calendar_color = form.get('calendar_color', '#3788d8').strip()  # Default blue color
+    if not (calendar_name and calendar_url):
+        return False
+    if 'calendar_urls' not in config:
+        config['calendar_urls'] = []
+    # Check if URL already exists
+    if any(cal.get('url') == calendar_url for cal in config['calendar_urls']):
+        logger.info(f"Calendar already exists for URL: {calendar_url}")
+        return False
+    config['calendar_urls'].append({
+        'name': calendar_name,
+        'url': calendar_url,
+        'color': calendar_color,
+        'id': uuid.uuid4().hex
+    })
+    # A feed that was removed and re-added is fetched fresh
+    invalidate_calendar_cache(calendar_url)
+    logger.info(f"Added calendar: {calendar_name} ({calendar_url})")
+    return True
+
+def _handle_remove_calendar(config, form):
+    """Removes a calendar by id (or by URL for legacy entries without id)."""
+    calendar_id = form.get('calendar_id')
+    calendar_url = form.get('calendar_url', '').strip()
+    if not (calendar_id or calendar_url):
+        logger.warning("remove_calendar called without calendar_id or calendar_url")
+        return False
+    calendars = config.setdefault('calendar_urls', [])
+    before_count = len(calendars)
+    target_idx = next(
+        (i for i, cal in enumerate(calendars)
+         if (calendar_id and cal.get('id') == calendar_id)
+         or (calendar_url and not cal.get('id') and cal.get('url') == calendar_url)),
+        None,
+    )
+    if target_idx is not None:
+        invalidate_calendar_cache(calendars[target_idx].get('url', ''))
+        del calendars[target_idx]
+    after_count = len(calendars)
+    # Remove from assignments too (only applies to calendars with ids)
+    if calendar_id:
+        assignments = config.get('calendar_assignments') or {}
+        for key, assigned in assignments.items():
+            assignments[key] = [cid for cid in assigned if cid != calendar_id]
+        config['calendar_assignments'] = assignments
+    logger.info(f"Removed calendar (id={calendar_id or 'n/a'}, url={calendar_url or 'n/a'}) ({before_count} -> {after_count})")
+    return True
+
+def _handle_set_brightness(config, form):
+    """Publishes a brightness command over MQTT."""
+    brightness_pct = form.get('brightness', '75')
+    brightness_val = float(brightness_pct) / 100.0
+    logger.info(f"COMMAND: Set Brightness to {brightness_val}")
+    # Publish command if MQTT is available; do not mutate state directly
+    try:
+        if mqtt_client is not None and _mqtt_connected:
+            mqtt_publish('pi/brightness/command', str(brightness_val))
+        else:
+            logger.warning("MQTT not connected; brightness command not published")
+    except Exception as e:
+        logger.error(f"Error publishing brightness command: {e}")
+    return False
+
+def _handle_browser_url(config, form):
+    """Publishes a browser URL change command over MQTT."""
+    url = form.get('url')
+    if not url:
+        return False
+    logger.info(f"COMMAND: Change URL to {url}")
+    try:
+        if mqtt_client is not None and _mqtt_connected:
+            mqtt_publish('pi/browser/command/url', url)
+        else:
+            logger.warning("MQTT not connected; browser URL command not published")
+    except Exception as e:
+        logger.error(f"Error publishing browser URL command: {e}")
+    return False
+
+def _handle_browser_refresh(config, form):
+    """Publishes a browser refresh command over MQTT."""
+    logger.info("COMMAND: Refresh Browser")
+    try:
+        if mqtt_client is not None and _mqtt_connected:
+            mqtt_publish('pi/browser/command/refresh', '1')
+        else:
+            logger.warning("MQTT not connected; browser refresh command not published")
+    except Exception as e:
+        logger.error(f"Error publishing browser refresh command: {e}")
+    return False
+
+def _handle_system_command(config, form):
+    """Publishes a display on/off or system restart command over MQTT."""
+    action = form.get('action')
+    logger.info(f"Received command: {action}")
+    try:
+        if mqtt_client is None or not _mqtt_connected:
+            logger.warning("MQTT not connected; command not published")
+        elif action == 'display_on':
+            mqtt_publish('pi/display/command', 'on')
+        elif action == 'display_off':
+            mqtt_publish('pi/display/command', 'off')
+        elif action == 'system_restart':
+            # Make sure the current config survives the restart
+            save_config(config, durable=True)
+            mqtt_publish('pi/system/command/restart', '1')
+    except Exception as e:
+        logger.error(f"Error publishing command for {action}: {e}")
+    return False
+
+ACTION_HANDLERS = {
+    'upload_pdf': _handle_upload_pdf,
+    'upload_screensaver_file': _handle_upload_screensaver_file,
+    'upload_screensaver_url': _handle_upload_screensaver_url,
+    'delete_screensaver': _handle_delete_screensaver,
+    'update_screensaver_activation': _handle_update_screensaver_activation,
+    'show_week_plan': _handle_show_week_plan,
+    'set_display_pages': _handle_set_display_pages,
+    'set_weekplan_layout': _handle_set_weekplan_layout,
+    'set_duration': _handle_set_duration,
+    'set_weekplan_details': _handle_set_weekplan_details,
+    'set_screensaver_buttons': _handle_set_screensaver_buttons,
+    'set_mqtt_config': _handle_set_mqtt_config,
+    'set_calendar_enabled': _handle_set_calendar_enabled,
+    'set_calendar_assignments': _handle_set_calendar_assignments,
+    'add_calendar': _handle_add_calendar,
+    'remove_calendar': _handle_remove_calendar,
+    'set_brightness': _handle_set_brightness,
+    'browser_url': _handle_browser_url,
+    'browser_refresh': _handle_browser_refresh,
+    'display_on': _handle_system_command,
+    'display_off': _handle_system_command,
+    'system_restart': _handle_system_command,
+}
+
 @app.route("/admin", methods=["GET", "POST"])
 def admin():
     """Renders the admin panel and handles all admin actions."""
-    global config, last_updates, mqtt_stats
+    global last_updates, mqtt_stats
 
     if request.args.get('refresh_status') == 'true':
         return jsonify(system_stats=get_system_stats())
@@ -946,320 +1904,38 @@ def admin():
     current_tab = request.args.get('tab', 'ukeplan')
 
     if request.method == 'POST':
-        # Always reload to avoid stale worker state during writes.
-        config = load_config()
-        action = request.form.get('action')
-        current_tab = request.form.get('current_tab', 'ukeplan') 
-
-        if action == 'upload_pdf':
-            file = request.files.get('pdf_file')
-            target = request.form.get('target', 'plan1')
-            allowed_targets = {plan.get('key') for plan in config.get("weekplans", []) if plan.get('key')}
-            if target not in allowed_targets:
-                logger.warning(f"Rejected upload_pdf target: {target!r}")
-            elif file and file.filename and allowed_file(file.filename, ALLOWED_PDF_EXTENSIONS):
-                filename = secure_filename(f"{target}.pdf")
-                filepath = os.path.join(UPLOAD_FOLDER, filename)
-                file.save(filepath)
-                try:
-                    images = convert_from_path(filepath, first_page=1, last_page=2)
-                    if images:
-                        image_path1 = os.path.join(STATIC_IMAGE_FOLDER, f"{target}-ukeplan.png")
-                        images[0].save(image_path1, 'PNG')
-                        if len(images) > 1:
-                            image_path2 = os.path.join(STATIC_IMAGE_FOLDER, f"{target}-ukeplan-2.png")
-                            images[1].save(image_path2, 'PNG')
-                        last_updates[target] = datetime.now()
-                        save_last_updates(last_updates)
-                except Exception as e:
-                    logger.error(f"Error converting PDF: {e}")
-            
-        elif action == 'upload_screensaver_file':
-            file = request.files.get('screensaver_file')
-            if file and file.filename and allowed_file(file.filename, ALLOWED_IMAGE_EXTENSIONS):
-                filename = secure_filename(file.filename)
-                if not any(d.get('filename') == filename for d in config["screensaver_config"]):
-                    file.save(os.path.join(SCREENSAVER_FOLDER, filename))
-                    config["screensaver_config"].append({"filename": filename, "active": True})
-                    save_config(config)
-            
-        elif action == 'upload_screensaver_url':
-            url = request.form.get('screensaver_url')
-            if url:
-                try:
-                    parsed_url = urlparse(url)
-                    if not all([parsed_url.scheme, parsed_url.netloc]):
-                        raise ValueError("Invalid URL provided")
-                    response = requests.get(url, stream=True, timeout=10)
-                    response.raise_for_status()
-                    content_type = response.headers.get('content-type', '').split(';')[0]
-                    if not content_type.startswith('image/'):
-                         raise ValueError(f"Invalid content type: {content_type}")
-                    filename = secure_filename(os.path.basename(parsed_url.path) or f"downloaded_{uuid.uuid4().hex[:8]}.jpg")
-                    if not allowed_file(filename, ALLOWED_IMAGE_EXTENSIONS):
-                        ext = content_type.split('/')[-1]
-                        valid_ext = ext if ext in ['jpeg', 'jpg', 'png', 'gif', 'webp'] else 'jpg'
-                        filename = f"{os.path.splitext(filename)[0]}.{valid_ext}"
-                    if not any(d.get('filename') == filename for d in config["screensaver_config"]):
-                        filepath = os.path.join(SCREENSAVER_FOLDER, filename)
-                        with open(filepath, 'wb') as f:
-                            for chunk in response.iter_content(chunk_size=8192):
-                                f.write(chunk)
-                        config["screensaver_config"].append({"filename": filename, "active": True})
-                        save_config(config)
-                except (requests.RequestException, ValueError) as e:
-                    logger.error(f"Error downloading from URL {redact_url_for_log(url)}: {e}")
-            
-        elif action == 'delete_screensaver':
-            filename = request.form.get('filename')
-            if filename:
-                safe_filename = secure_filename(filename)
-                filepath = os.path.join(SCREENSAVER_FOLDER, safe_filename)
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                config["screensaver_config"] = [item for item in config["screensaver_config"] if item['filename'] != safe_filename]
-                save_config(config)
-            
-        elif action == 'update_screensaver_activation':
-            active_images = request.form.getlist('active_images')
-            for item in config["screensaver_config"]:
-                item['active'] = item['filename'] in active_images
-            save_config(config)
-            
-        elif action == 'show_week_plan':
-            duration = config.get("dashboard_duration", 10)
-            view = request.form.get('view', 'all')
-            if view not in ['all', 'plan1', 'plan2']:
-                view = 'all'
-            set_forced_dashboard_until(datetime.now() + timedelta(seconds=duration), view=view)
-            
-        elif action == 'set_display_pages':
-            # Save which page to show in "All" view per plan (priority page)
-            for plan in config.get('weekplans', []):
-                key = plan['key']
-                val = request.form.get(f'display_page_{key}', str(plan.get('display_page', 1)))
-                try:
-                    page_num = int(val)
-                    plan['display_page'] = 2 if page_num == 2 else 1
-                except ValueError:
-                    plan['display_page'] = 1
-            save_config(config)
-
-        elif action == 'set_weekplan_layout':
-            layout = request.form.get('weekplan_layout', 'full')
-            if layout in ('full', 'simple'):
-                config['weekplan_layout'] = layout
-            try:
-                size = max(24, min(96, int(request.form.get('simple_layout_nav_button_size', 48))))
-                config['simple_layout_nav_button_size'] = size
-            except (ValueError, TypeError):
-                pass
-            save_config(config)
-            
-        elif action == 'set_duration':
-            config['dashboard_duration'] = int(request.form.get('dashboard_duration', 10))
-            # Also allow saving language in this general form
-            lang = request.form.get('dashboard_language')
-            if lang in ['en-GB', 'nb-NO']:
-                config['dashboard_language'] = lang
-            save_config(config)
-
-        elif action == 'set_weekplan_details':
-            for plan in config.get('weekplans', []):
-                plan['name'] = request.form.get(f"name_{plan['key']}", plan['name'])
-                plan['icon'] = request.form.get(f"icon_{plan['key']}", plan['icon'])
-                plan['enable_icon'] = f"enable_icon_{plan['key']}" in request.form
-            save_config(config)
-
-        elif action == 'set_screensaver_buttons':
-            defaults = [
-                {"enabled": False, "label": "Show Weekplan 1", "action": "plan1", "use_custom_color": False, "color": "#ffffff", "font_color": "auto"},
-                {"enabled": False, "label": "Show Weekplan 2", "action": "plan2", "use_custom_color": False, "color": "#ffffff", "font_color": "auto"},
-                {"enabled": False, "label": "Show both weekplans", "action": "all", "use_custom_color": False, "color": "#ffffff", "font_color": "auto"},
-                {"enabled": False, "label": "Custom URL", "action": "url", "url": "", "target_top": False, "use_custom_color": False, "color": "#ffffff", "font_color": "auto"},
-            ]
-            buttons = []
-            for i, d in enumerate(defaults):
-                enabled = f"screensaver_btn_{i}_enabled" in request.form
-                label = request.form.get(f"screensaver_btn_{i}_label", d["label"]).strip() or d["label"]
-                action = d["action"]
-                url = request.form.get(f"screensaver_btn_{i}_url", "").strip() if action == "url" else ""
-                use_custom_color = f"screensaver_btn_{i}_use_custom_color" in request.form
-                color = request.form.get(f"screensaver_btn_{i}_color", "#ffffff").strip() or "#ffffff"
-                font_color = request.form.get(f"screensaver_btn_{i}_font_color", "auto")
-                if font_color not in ("auto", "white", "black"):
-                    font_color = "auto"
-                btn = {"enabled": enabled, "label": label, "action": action, "use_custom_color": use_custom_color, "color": color, "font_color": font_color}
-                if action == "url":
-                    btn["url"] = url
-                    btn["target_top"] = f"screensaver_btn_{i}_target_top" in request.form
-                buttons.append(btn)
-            config["screensaver_buttons"] = buttons
-            h = request.form.get("screensaver_buttons_horizontal", "center")
-            v = request.form.get("screensaver_buttons_vertical", "bottom")
-            if h not in ("left", "center", "right"):
-                h = "center"
-            if v not in ("top", "center", "bottom"):
-                v = "bottom"
-            use_custom_height = "screensaver_buttons_use_custom_height" in request.form
-            try:
-                height_px = max(24, min(200, int(request.form.get("screensaver_buttons_height_px", 44))))
-            except (TypeError, ValueError):
-                height_px = 44
-            config["screensaver_buttons_position"] = {"horizontal": h, "vertical": v, "use_custom_height": use_custom_height, "height_px": height_px}
-            save_config(config)
-
-        elif action == 'set_mqtt_config':
-            env_controlled = get_mqtt_env_controlled()
-            options_controlled = get_mqtt_options_controlled()
-            externally_controlled = env_controlled | options_controlled
-            if 'enable_mqtt' not in externally_controlled:
-                config['enable_mqtt'] = 'enable_mqtt' in request.form
-            if 'mqtt_broker' not in externally_controlled:
-                config['mqtt_broker'] = request.form.get('mqtt_broker', 'homeassistant.local')
-            if 'mqtt_port' not in externally_controlled:
-                config['mqtt_port'] = int(request.form.get('mqtt_port', 1883))
-            if 'mqtt_user' not in externally_controlled:
-                config['mqtt_user'] = request.form.get('mqtt_user', '')
-            if 'mqtt_pass' not in externally_controlled:
-                config['mqtt_pass'] = request.form.get('mqtt_pass', '')
-            save_config(config)
-            
-        elif action == 'set_calendar_enabled':
-            config['enable_calendar'] = 'enable_calendar' in request.form
-            save_config(config)
-
-        elif action == 'set_calendar_assignments':
-            # For each plan, read selected calendar IDs
-            assignments: Dict[str, List[str]] = {}
-            calendar_ids = {cal.get('id') for cal in config.get('calendar_urls', []) if cal.get('id')}
-            for plan in config.get('weekplans', []):
-                key = plan['key']
-                selected = [cid for cid in request.form.getlist(f'assign_{key}') if cid in calendar_ids]
-                assignments[key] = selected
-            config['calendar_assignments'] = assignments
-            logger.info(f"Saved calendar assignments for {len(assignments)} plans")
-            save_config(config)
-
-        elif action == 'add_calendar':
-            calendar_name = request.form.get('calendar_name', '').strip()
-            calendar_url = request.form.get('calendar_url', '').strip()
-            calendar_color = request.form.get('calendar_color', '#3788d8').strip()  # Default blue color
-            if calendar_name and calendar_url:
-                if 'calendar_urls' not in config:
-                    config['calendar_urls'] = []
-                # Check if URL already exists
-                if not any(cal.get('url') == calendar_url for cal in config['calendar_urls']):
-                    config['calendar_urls'].append({
-                        'name': calendar_name,
-                        'url': calendar_url,
-                        'color': calendar_color,
-                        'id': str(uuid.uuid4())
-                    })
-                    save_config(config)
-                    logger.info(f"Added calendar: {calendar_name} ({calendar_url})")
-                else:
-                    logger.info(f"Calendar already exists for URL: {calendar_url}")
-                    
-        elif action == 'remove_calendar':
-            calendar_id = request.form.get('calendar_id')
-            calendar_url = request.form.get('calendar_url', '').strip()
-            if calendar_id or calendar_url:
-                before_count = len(config.get('calendar_urls', []))
-                def _keep_calendar(cal):
-                    if calendar_id and cal.get('id') == calendar_id:
-                        return False
-                    if calendar_url and not cal.get('id') and cal.get('url') == calendar_url:
-                        return False
-                    return True
-                config['calendar_urls'] = [cal for cal in config.get('calendar_urls', []) if _keep_calendar(cal)]
-                after_count = len(config.get('calendar_urls', []))
-                # Remove from assignments too (only applies to calendars with ids)
-                if calendar_id:
-                    assignments = config.get('calendar_assignments', {}) or {}
-                    for key, assigned in assignments.items():
-                        assignments[key] = [cid for cid in assigned if cid != calendar_id]
-                    config['calendar_assignments'] = assignments
-                save_config(config)
-                logger.info(f"Removed calendar (id={calendar_id or 'n/a'}, url={calendar_url or 'n/a'}) ({before_count} -> {after_count})")
-            else:
-                logger.warning("remove_calendar called without calendar_id or calendar_url")
-            
-        elif action == 'set_brightness':
-            brightness_pct = request.form.get('brightness', '75')
-            brightness_val = float(brightness_pct) / 100.0
-            logger.info(f"COMMAND: Set Brightness to {brightness_val}")
-            # Publish command if MQTT is available; do not mutate state directly
-            try:
-                if mqtt_client is not None and mqtt_client.is_connected():
-                    mqtt_client.publish('pi/brightness/command', str(brightness_val), qos=0, retain=False)
-                else:
-                    logger.warning("MQTT not connected; brightness command not published")
-            except Exception as e:
-                logger.error(f"Error publishing brightness command: {e}")
-        
-        elif action == 'browser_url':
-            url = request.form.get('url')
-            if url:
-                logger.info(f"COMMAND: Change URL to {url}")
-                try:
-                    if mqtt_client is not None and mqtt_client.is_connected():
-                        mqtt_client.publish('pi/browser/command/url', url, qos=0, retain=False)
-                    else:
-                        logger.warning("MQTT not connected; browser URL command not published")
-                except Exception as e:
-                    logger.error(f"Error publishing browser URL command: {e}")
-
-        elif action == 'browser_refresh':
-            logger.info("COMMAND: Refresh Browser")
-            try:
-                if mqtt_client is not None and mqtt_client.is_connected():
-                    mqtt_client.publish('pi/browser/command/refresh', '1', qos=0, retain=False)
-                else:
-                    logger.warning("MQTT not connected; browser refresh command not published")
-            except Exception as e:
-                logger.error(f"Error publishing browser refresh command: {e}")
-
-        elif action in ['display_on', 'display_off', 'system_restart']:
-            logger.info(f"Received command: {action}")
-            try:
-                if mqtt_client is None or not mqtt_client.is_connected():
-                    logger.warning("MQTT not connected; command not published")
-                else:
-                    if action == 'display_on':
-                        mqtt_client.publish('pi/display/command', 'on', qos=0, retain=False)
-                    elif action == 'display_off':
-                        mqtt_client.publish('pi/display/command', 'off', qos=0, retain=False)
-                    elif action == 'system_restart':
-                        mqtt_client.publish('pi/system/command/restart', '1', qos=0, retain=False)
-            except Exception as e:
-                logger.error(f"Error publishing command for {action}: {e}")
-
+        # Always reload to avoid stale worker state during writes. The copy is
+        # private to this request; the shared cached config is never mutated.
+        cfg = load_config()
+        form = request.form
+        action = form.get('action')
+        current_tab = form.get('current_tab', 'ukeplan') 
+        # Handlers only report whether the config changed; it is written once here
+        config_dirty = False
+
+        handler = ACTION_HANDLERS.get(action)
+        if handler:
+            config_dirty = handler(cfg, form)
+
+        if config_dirty:
+            save_config(cfg)
         return redirect(url_for('admin', tab=current_tab))
 
+    cfg = get_config()
     system_stats = get_system_stats()
-    mqtt_connected = config.get('enable_mqtt') and mqtt_client is not None and mqtt_client.is_connected()
+    mqtt_connected = cfg.get('enable_mqtt') and mqtt_client is not None and _mqtt_connected
     mqtt_env_controlled = get_mqtt_env_controlled()
     mqtt_options_controlled = get_mqtt_options_controlled()
     mqtt_externally_controlled = bool(mqtt_env_controlled or mqtt_options_controlled)
 
-    # Set locale for date formatting (match dashboard language)
-    try:
-        loc = "nb_NO.UTF-8" if config.get("dashboard_language") == "nb-NO" else "en_GB.UTF-8"
-        locale.setlocale(locale.LC_TIME, loc)
-    except locale.Error:
-        try:
-            locale.setlocale(locale.LC_TIME, "")
-        except locale.Error:
-            pass
-
     # Build display_last_updates with file mtime fallback for plans missing in last_updates
-    display_last_updates = {p['key']: get_display_last_update(p['key']) for p in config.get('weekplans', [])}
+    display_last_updates = {p['key']: get_display_last_update(p['key']) for p in cfg.get('weekplans', [])}
 
     app_version = get_app_version()
-    return render_template(
+    # Stream the page as it renders; the admin view is never cached
+    response = app.response_class(stream_template(
         'admin.html',
-        config=config,
+        config=cfg,
         last_updates=display_last_updates,
         system_stats=system_stats,
         mqtt_stats=mqtt_stats,
@@ -1270,8 +1946,10 @@ def admin():
         current_tab=current_tab,
         app_version=app_version,
         release_url=get_release_url(app_version)
-    )
+    ))
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5001, debug=True)
+    app.run(host="0.0.0.0", port=5001, debug=False, threaded=True)
 